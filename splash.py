@@ -7,17 +7,40 @@ Detects bobbers using computer vision and audio cues
 import time
 import os
 import sys
+import atexit
+import logging
+import queue
+import ctypes
 import json
 import tempfile
 import subprocess
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from logging.handlers import QueueHandler, QueueListener
 
 import numpy as np
+import scipy.fft
 import cv2
+import mss
 import soundcard as sc
 import pyautogui
-from PIL import Image
 from pynput import keyboard as pynput_keyboard
 
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    # Kernels stay plain Python and are bypassed by their callers
+    HAVE_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        return lambda function: function
+
+try:
+    import Quartz  # macOS only, installed with pyautogui through pyobjc
+except ImportError:
+    Quartz = None
+
 
 # =============================================================================
 # GLOBAL CONFIGURATION
@@ -26,6 +49,13 @@ from pynput import keyboard as pynput_keyboard
 # Flag for ESC key interruption
 esc_pressed = False
 
+# Logging for the fishing loop; VERBOSE adds per-cycle detail
+VERBOSE = False
+logger = logging.getLogger('wetfish')
+
+# Shared random generator for human-like timing and cursor jitter
+rng = np.random.default_rng()
+
 # Game-specific timing configurations (in seconds)
 GAME_TIMERS = {
     'era': 27,      # Era/SoD bobber timeout
@@ -34,6 +64,7 @@ GAME_TIMERS = {
 
 # Audio detection settings
 AUDIO_SAMPLE_RATE = 48000
+AUDIO_BLOCK_SIZE = 2048  # Frames per recorded block (~43 ms at 48 kHz)
 AUDIO_THRESHOLD = 0.06  # Peak threshold for bite detection
 
 # Lure application timing
@@ -43,16 +74,61 @@ last_lure_time = None     # Timestamp of the last lure application
 
 # Template matching settings
 BOBBER_MATCH_THRESHOLD = 0.6  # Confidence threshold for bobber detection
+HIGH_CONF_THRESHOLD = 0.85    # Stop scoring templates once one beats this
+PYRAMID_LEVELS = 2            # pyrDown steps for the coarse pass (4x smaller)
+TEMPLATE_RESORT_INTERVAL = 20 # Re-rank templates by hit count every N hits
+REFINE_LATENCY_LIMIT = 0.002  # Try the Numba SAD refiner if OpenCV's is slower (seconds)
+LOCAL_SEARCH_SCALE = 6        # Local search window size, in hit-template sizes (+/-3 w/h)
+LOCAL_SEARCH_MAX_AREA = 0.5   # Search locally only if the window is below this share of the region
+
+# Worker threads for template scoring (NumPy FFTs and OpenCV release the GIL).
+# Kept well below the template count so an early exit skips most templates.
+TEMPLATE_WORKERS = min(os.cpu_count() or 1, 4)
+TEMPLATE_POOL = ThreadPoolExecutor(max_workers=TEMPLATE_WORKERS)
 
 # Global variables set during initialization
 BOBBER_TEMPLATES_CV = []  # Preloaded OpenCV templates
+BOBBER_TEMPLATE_STATS = []  # Zero-mean float32 template and its L2 norm, per template
+BOBBER_SPECTRA = None     # Precomputed template FFTs for the search region
+LOCAL_PLANS = {}          # Template index -> (spectra, buffer) for its local search window
+last_hit_xy = None        # Bobber center of the last hit, relative to BOBBER_REGION
+last_hit_index = None     # Template index of the last hit
+template_hits = []        # Times each template produced the best match
+template_order = []       # Template indices in search order, most frequent hits first
+use_sad_refine = False    # Refine with the Numba SAD kernel instead of OpenCV
 BOBBER_REGION = None      # Screen region to search for bobber
+screen_capture = None     # Persistent mss capture object
+capture_scale = 1.0       # Frame pixels per screen point (2.0 on Retina displays)
+gray_buffer = None        # Preallocated grayscale frame buffer
 wait_timer = None         # Game-specific wait timer
 castingkey = None         # Key to cast fishing line
 lurekey = None         # Macro key to apply lure
 input_device = None       # Audio device selection
 
 
+# =============================================================================
+# LOGGING
+# =============================================================================
+
+def setup_logging():
+    """
+    Route the 'wetfish' logger through a queue drained by a background thread.
+    The fishing loop only enqueues records, so it never blocks on console output.
+    Pending records are flushed when the program exits.
+    """
+    log_queue = queue.SimpleQueue()
+    
+    logger.setLevel(logging.DEBUG if VERBOSE else logging.INFO)
+    logger.addHandler(QueueHandler(log_queue))
+    logger.propagate = False
+    
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter('%(message)s'))
+    listener = QueueListener(log_queue, console)
+    listener.start()
+    atexit.register(listener.stop)
+
+
 # =============================================================================
 # KEYBOARD INPUT HANDLER
 # =============================================================================
@@ -69,7 +145,7 @@ def on_press(key):
     try:
         if key == pynput_keyboard.Key.esc:
             esc_pressed = True
-            print("\n<< ESC pressed - Exiting soon... >>")
+            logger.info("\n<< ESC pressed - Exiting soon... >>")
     except Exception:
         pass
 
@@ -84,142 +160,275 @@ def cast_line():
     Adds human-like variability to keypress duration.
     """
     # Random delay before casting
-    time.sleep(np.random.uniform(0.3, 0.55))
+    time.sleep(rng.uniform(0.3, 0.55))
     
     # Press and hold the cast key
-    pyautogui.keyDown(f'{castingkey}')
-    time.sleep(np.random.uniform(0.1, 0.3))
-    pyautogui.keyUp(f'{castingkey}')
+    pyautogui.keyDown(castingkey)
+    time.sleep(rng.uniform(0.1, 0.3))
+    pyautogui.keyUp(castingkey)
+    
+
+def move_mouse(x, y):
+    """
+    Move the cursor to (x, y) in a single OS call.
+    Skips pyautogui's eased motion and its post-call pause, falling back to
+    pyautogui.moveTo when no native API is available.
+    
+    Args:
+        x: Absolute screen x coordinate
+        y: Absolute screen y coordinate
+    """
+    x, y = int(round(x)), int(round(y))
+    
+    if sys.platform == 'win32':
+        ctypes.windll.user32.SetCursorPos(x, y)
+    elif Quartz is not None:
+        event = Quartz.CGEventCreateMouseEvent(
+            None, Quartz.kCGEventMouseMoved, (x, y), Quartz.kCGMouseButtonLeft
+        )
+        Quartz.CGEventPost(Quartz.kCGHIDEventTap, event)
+    else:
+        pyautogui.moveTo(x, y, duration=0, _pause=False)
     
 
 def find_bob():
     """
     Search for the fishing bobber in the defined screen region using template matching.
-    Uses OpenCV's matchTemplate to find the bobber with the highest confidence.
+    Looks for the previously matched template in a small window around the
+    previous hit first and falls back to the whole region on a miss.
     
     Sets global bob_found flag to True if bobber is detected.
     Moves mouse cursor to bobber location if found.
     """
-    global bob_found
+    global bob_found, last_hit_xy, last_hit_index
     bob_found = False
 
     # Check for exit signal
     if esc_pressed:
-        print("<< Exiting >>")
+        logger.info("<< Exiting >>")
         exit()
 
-    # Capture the screen region
-    try:
-        time.sleep(np.random.uniform(0.3, 0.6))
-        screenshot = pyautogui.screenshot(region=BOBBER_REGION)
-        screenshot_np = np.array(screenshot)
-        screenshot_gray = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2GRAY)
-    except Exception as e:
-        print(f"Error capturing screen region. Check region coordinates. {e}")
-        time.sleep(1)
-        return
-
-    # Search through all preloaded templates
+    time.sleep(rng.uniform(0.3, 0.6))
     best_match = None
-    best_val = 0
     
-    for template in BOBBER_TEMPLATES_CV:
-        try:
-            # Perform template matching using normalized correlation
-            result = cv2.matchTemplate(screenshot_gray, template, cv2.TM_CCOEFF_NORMED)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-            
-            # Update best match if this template has higher confidence
-            if max_val > BOBBER_MATCH_THRESHOLD and max_val > best_val:
-                best_val = max_val
-                best_match = (max_loc, template.shape)
-        except Exception as e:
-            print(f"Error matching template: {e}")
-            continue
+    # Search a small window around the previous hit first
+    if last_hit_index in LOCAL_PLANS:
+        spectra, buffer = LOCAL_PLANS[last_hit_index]
+        origin = local_search_origin(last_hit_xy, buffer.shape)
+        best_match = search_region(origin, buffer, spectra)
+    
+    # Fall back to the whole region on a miss
+    if best_match is None:
+        last_hit_xy = None
+        last_hit_index = None
+        best_match = search_region((0, 0), gray_buffer, BOBBER_SPECTRA)
 
     # Process the best match if found
     if best_match:
-        loc, (h, w) = best_match
+        loc, index, best_val = best_match
+        h, w = BOBBER_TEMPLATES_CV[index].shape
+        last_hit_xy = (loc[0] + w // 2, loc[1] + h // 2)
+        last_hit_index = index
         
-        # Convert relative coordinates to absolute screen coordinates
-        abs_x = BOBBER_REGION[0] + loc[0]
-        abs_y = BOBBER_REGION[1] + loc[1]
+        # Convert frame pixels to absolute screen coordinates (points on HiDPI displays)
+        abs_x = BOBBER_REGION[0] + loc[0] / capture_scale
+        abs_y = BOBBER_REGION[1] + loc[1] / capture_scale
 
-        print(f'Found the bobber at (absolute): ({abs_x}, {abs_y}) - Confidence: {best_val:.2f}')
+        logger.debug(f'Found the bobber at (absolute): ({abs_x:.0f}, {abs_y:.0f}) - Confidence: {best_val:.2f}')
         
         # Calculate center of bobber with small random offset for naturalness
         screen_loc_offset = (
-            abs_x + w // 2 + np.random.uniform(-3, 3),
-            abs_y + h // 2 + np.random.uniform(-3, 3)
+            abs_x + w / 2 / capture_scale + rng.uniform(-3, 3),
+            abs_y + h / 2 / capture_scale + rng.uniform(-3, 3)
         )
         
-        # Move mouse to bobber location with easing
-        print(f"<< Found Bob! Moving cursor... >>")
-        pyautogui.moveTo(
-            screen_loc_offset[0], 
-            screen_loc_offset[1], 
-            np.random.uniform(0.1, 0.25), 
-            pyautogui.easeOutQuad
-        )
+        # Move mouse straight to bobber location
+        logger.info(f"<< Found Bob! Moving cursor... >>")
+        move_mouse(screen_loc_offset[0], screen_loc_offset[1])
         
         bob_found = True
         return
     
-    print("<< Bobber not found in region. >>")
+    logger.info("<< Bobber not found in region. >>")
+
+
+def local_search_origin(center, shape):
+    """
+    Position a local search window around a point, kept inside BOBBER_REGION.
+    The corner is snapped to whole screen points so it can be captured exactly.
+    
+    Args:
+        center: (x, y) in frame pixels relative to BOBBER_REGION
+        shape: (height, width) of the local window in frame pixels
+        
+    Returns:
+        (x, y) top-left corner of the window in frame pixels relative to BOBBER_REGION
+    """
+    height, width = shape
+    frame_height, frame_width = gray_buffer.shape
+    step = capture_step()
+    x0 = min(max(center[0] - width // 2, 0), frame_width - width)
+    y0 = min(max(center[1] - height // 2, 0), frame_height - height)
+    return x0 - x0 % step, y0 - y0 % step
+
+
+def search_region(origin, buffer, spectra):
+    """
+    Capture part of BOBBER_REGION and look for the bobber in it.
+    Scores all templates on a downsampled copy of the capture, then refines the
+    best candidate with OpenCV's matchTemplate at full resolution.
+    
+    Args:
+        origin: (x, y) of the capture relative to BOBBER_REGION
+        buffer: Preallocated grayscale buffer, sized to the capture
+        spectra: Template spectra prepared for the buffer size
+        
+    Returns:
+        Tuple of ((x, y) relative to BOBBER_REGION, template index, confidence),
+        or None if no bobber was found
+    """
+    global template_order
+
+    # Capture the screen region
+    try:
+        screenshot_gray = capture_region_gray(origin, buffer)
+    except Exception as e:
+        logger.error(f"Error capturing screen region. Check region coordinates. {e}")
+        time.sleep(1)
+        return None
+
+    # Coarse pass: score all templates on the downsampled screenshot
+    best_candidate = None
+    best_val = 0
+
+    try:
+        coarse_gray = build_pyramid(screenshot_gray, spectra['levels'], spectra['pyramid'])
+        order = [spectra['positions'][j] for j in template_order if j in spectra['positions']]
+        scores = match_templates_fft(coarse_gray, spectra, order, HIGH_CONF_THRESHOLD)
+    except Exception as e:
+        logger.error(f"Error matching templates: {e}")
+        scores = {}
+
+    for i, (max_val, max_loc) in scores.items():
+        # Update best candidate if this template has higher confidence
+        if max_val > BOBBER_MATCH_THRESHOLD and max_val > best_val:
+            best_val = max_val
+            best_candidate = (i, max_loc)
+
+    if best_candidate is None:
+        return None
+
+    # Fine pass: refine the best candidate and confirm it at full resolution
+    i, coarse_loc = best_candidate
+    index = spectra['indices'][i]
+    loc = refine_match(screenshot_gray, coarse_loc, spectra, i)
+    best_val = match_confidence(screenshot_gray, loc, BOBBER_TEMPLATE_STATS[index])
+    
+    if best_val <= BOBBER_MATCH_THRESHOLD:
+        return None
+    
+    # Track which templates hit so the most useful ones are tried first
+    template_hits[index] += 1
+    if sum(template_hits) % TEMPLATE_RESORT_INTERVAL == 0:
+        template_order = sorted(template_order, key=lambda j: -template_hits[j])
+    
+    return (origin[0] + loc[0], origin[1] + loc[1]), index, best_val
+
+
+@njit(cache=True, fastmath=True)
+def abs_max(samples):
+    """
+    Return the largest absolute sample value in a single pass.
+    Fuses abs() and max() so no temporary array is allocated per chunk.
+    
+    Args:
+        samples: 1-D array of audio samples
+        
+    Returns:
+        Peak absolute amplitude
+    """
+    peak = 0.0
+    for i in range(samples.shape[0]):
+        value = samples[i]
+        if value < 0:
+            value = -value
+        if value > peak:
+            peak = value
+    return peak
+
+
+def audio_peak(data):
+    """
+    Return the peak absolute amplitude of a recorded audio block.
+    Uses the fused Numba kernel when available; otherwise takes abs() in place,
+    since the block is not needed afterwards, and reduces with max().
+    
+    Args:
+        data: Audio block as returned by the recorder
+        
+    Returns:
+        Peak absolute amplitude
+    """
+    samples = data.reshape(-1)
+    if HAVE_NUMBA:
+        return abs_max(samples)
+    np.abs(samples, out=samples)
+    return samples.max()
 
 
 def reel_in():
     """
     Monitor audio for the fishing bite sound and reel in when detected.
-    Continuously records audio and checks for peaks above threshold.
+    Streams audio in short blocks and checks each block for peaks above threshold,
+    so a bite is detected within one block instead of after a full second.
     
     Sets global reeled flag to True if successfully reeled in.
     Times out after wait_timer seconds if no bite detected.
     """
     global reeled
     reeled = False
-    seconds_timer = 0
+    samples_seen = 0
     
     # Initialize the appropriate audio device
     mic = get_audio_device()
     if mic is None:
         return
     
-    # Monitor audio until bite detected or timeout
-    while True:
-        # Check for exit signal
-        if esc_pressed:
-            print("<< Exiting >>")
-            exit()
-            
-        try:
-            # Record 1 second of audio
-            data = mic.record(samplerate=AUDIO_SAMPLE_RATE, numframes=AUDIO_SAMPLE_RATE)
-            audio_peak = np.max(abs(data))
-            seconds_timer += 1
-
-            # Check if audio peak indicates a bite
-            if audio_peak > AUDIO_THRESHOLD: 
-                print("<< You (hopefully) caught something! >>\n")
+    try:
+        with mic.recorder(samplerate=AUDIO_SAMPLE_RATE, blocksize=AUDIO_BLOCK_SIZE) as recorder:
+            # Monitor audio until bite detected or timeout
+            while True:
+                # Check for exit signal
+                if esc_pressed:
+                    logger.info("<< Exiting >>")
+                    exit()
                 
-                # Right-click to reel in
-                pyautogui.mouseDown(button='right')
-                time.sleep(np.random.uniform(0.03, 0.08))
-                pyautogui.mouseUp(button='right')
+                # Record one short block of audio
+                data = recorder.record(numframes=AUDIO_BLOCK_SIZE)
+                peak = audio_peak(data)
+                samples_seen += data.shape[0]
+
+                # Check if audio peak indicates a bite
+                if peak > AUDIO_THRESHOLD: 
+                    logger.info("<< You (hopefully) caught something! >>\n")
+                    
+                    # Right-click to reel in
+                    pyautogui.mouseDown(button='right')
+                    time.sleep(rng.uniform(0.03, 0.08))
+                    pyautogui.mouseUp(button='right')
+                    
+                    # Wait for bobber animation to complete
+                    time.sleep(rng.uniform(1.8, 2.2))
+                    reeled = True
+                    break
                 
-                # Wait for bobber animation to complete
-                time.sleep(np.random.uniform(1.8, 2.2))
-                reeled = True
-                break
-            
-            # Timeout if no bite detected
-            if seconds_timer > wait_timer:
-                print("<< Failed. Trying again. >>")
-                break
+                # Timeout if no bite detected
+                if samples_seen / AUDIO_SAMPLE_RATE > wait_timer:
+                    logger.info("<< Failed. Trying again. >>")
+                    break
                 
-        except Exception as e:
-            print(f"Error during audio recording: {e}")
-            break
+    except Exception as e:
+        logger.error(f"Error during audio recording: {e}")
 
 
 # =============================================================================
@@ -235,35 +444,112 @@ def get_audio_device():
     """
     try:
         if input_device == '1':
-            print("<< WARNING: Monitoring Default Speakers is not supported on macOS. >>")
-            print("<< Listening to DEFAULT MICROPHONE instead. >>")
+            logger.warning("<< WARNING: Monitoring Default Speakers is not supported on macOS. >>")
+            logger.warning("<< Listening to DEFAULT MICROPHONE instead. >>")
             return sc.default_microphone()
             
         elif input_device == '2':
-            print("<< Monitoring 'VoiceMeeter Input' microphone... >>")
+            logger.debug("<< Monitoring 'VoiceMeeter Input' microphone... >>")
             return sc.get_microphone('VoiceMeeter Input')
             
         elif input_device == '3':
-            print("<< Monitoring 'BlackHole' microphone... >>")
+            logger.debug("<< Monitoring 'BlackHole' microphone... >>")
             return sc.get_microphone('BlackHole')
             
         else:
-            print("<< Invalid audio device selected. Exiting. >>")
+            logger.error("<< Invalid audio device selected. Exiting. >>")
             exit()
             
     except Exception as e:
-        print(f"\n--- !! Audio Device Error !! ---")
-        print(f"Could not find the microphone for your selection (input_device='{input_device}').")
-        print(f"Make sure the required audio device is installed and working.")
-        print("Available microphones are:")
+        logger.error(f"\n--- !! Audio Device Error !! ---")
+        logger.error(f"Could not find the microphone for your selection (input_device='{input_device}').")
+        logger.error(f"Make sure the required audio device is installed and working.")
+        logger.error("Available microphones are:")
         try:
-            print([m.name for m in sc.all_microphones(include_loopback=False)])
+            logger.error(str([m.name for m in sc.all_microphones(include_loopback=False)]))
         except Exception:
-            print("Could not list microphones.")
-        print(f"Details: {e}\n")
+            logger.error("Could not list microphones.")
+        logger.error(f"Details: {e}\n")
         return None
 
 
+# =============================================================================
+# SCREEN CAPTURE
+# =============================================================================
+
+def init_capture(region):
+    """
+    Open a persistent mss capture and preallocate the grayscale frame buffer.
+    The buffer is sized from a first grab, so it always matches what mss returns.
+    On HiDPI displays mss returns more pixels than the region has points; the
+    ratio is kept in capture_scale to convert matches back to screen points.
+    
+    Args:
+        region: Tuple of (left, top, width, height) to capture
+        
+    Returns:
+        (height, width) of the captured frames
+    """
+    global screen_capture, capture_scale, gray_buffer
+    
+    screen_capture = mss.mss()
+    raw = screen_capture.grab({
+        'left': region[0],
+        'top': region[1],
+        'width': region[2],
+        'height': region[3],
+    })
+    gray_buffer = np.empty((raw.height, raw.width), dtype=np.uint8)
+    
+    capture_scale = raw.width / region[2]
+    if raw.height != round(region[3] * capture_scale) or capture_scale != round(capture_scale):
+        print(f"!! WARNING: Unexpected capture size {raw.width}x{raw.height} "
+              f"for a {region[2]}x{region[3]} region. Clicks may be misplaced.")
+    elif capture_scale != 1:
+        print(f"HiDPI display detected: captures are {capture_scale:g}x the region size. "
+              f"Templates are matched in pixels and converted back to screen points.")
+    
+    return gray_buffer.shape
+
+
+def capture_step():
+    """
+    Return the number of frame pixels per whole screen point.
+    
+    Returns:
+        1 on regular displays, 2 on Retina displays
+    """
+    return max(int(round(capture_scale)), 1)
+
+
+def capture_region_gray(origin, buffer):
+    """
+    Grab part of BOBBER_REGION and convert it to grayscale in a single pass.
+    The raw BGRA pixels are read in place through NumPy's array interface,
+    so the only copy made is the grayscale frame itself.
+    
+    Args:
+        origin: (x, y) of the capture in frame pixels relative to BOBBER_REGION
+        buffer: Preallocated grayscale buffer; its shape sets the capture size
+        
+    Returns:
+        Grayscale frame (the buffer, overwritten on every call)
+    """
+    # mss takes the rectangle in screen points, not frame pixels
+    raw = screen_capture.grab({
+        'left': BOBBER_REGION[0] + round(origin[0] / capture_scale),
+        'top': BOBBER_REGION[1] + round(origin[1] / capture_scale),
+        'width': round(buffer.shape[1] / capture_scale),
+        'height': round(buffer.shape[0] / capture_scale),
+    })
+    if (raw.height, raw.width) != buffer.shape:
+        raise ValueError(
+            f"captured {raw.width}x{raw.height} pixels, expected "
+            f"{buffer.shape[1]}x{buffer.shape[0]}"
+        )
+    return cv2.cvtColor(np.asarray(raw), cv2.COLOR_BGRA2GRAY, dst=buffer)
+
+
 # =============================================================================
 # REGION SELECTION GUI
 # =============================================================================
@@ -468,6 +754,466 @@ def load_bobber_templates():
         exit()
 
 
+def build_pyramid(image, levels, buffers=None):
+    """
+    Downsample an image by 2x per level with cv2.pyrDown.
+    
+    Args:
+        image: Grayscale image to downsample
+        levels: Number of pyrDown steps
+        buffers: Optional preallocated destination array for each level
+        
+    Returns:
+        The downsampled image
+    """
+    for level in range(levels):
+        image = cv2.pyrDown(image, dst=buffers[level] if buffers else None)
+    return image
+
+
+def pyramid_shape(shape, levels):
+    """
+    Compute the size cv2.pyrDown produces after the given number of levels.
+    
+    Args:
+        shape: (height, width) at full resolution
+        levels: Number of pyrDown steps
+        
+    Returns:
+        (height, width) at the coarse level
+    """
+    height, width = shape
+    for _ in range(levels):
+        height, width = (height + 1) // 2, (width + 1) // 2
+    return height, width
+
+
+def prepare_template_spectra(templates, shape, levels=PYRAMID_LEVELS, include=None):
+    """
+    Precompute the conjugated FFT of every downsampled template, padded to the
+    next size pocketfft transforms quickly (scipy.fft.next_fast_len) at or above
+    the downsampled screenshot size. Templates are zero-meaned first, so correlating
+    them with a screenshot directly yields the numerator of TM_CCOEFF_NORMED.
+    Also preallocates every work buffer find_bob() needs for this frame size.
+    
+    Args:
+        templates: List of grayscale OpenCV image arrays
+        shape: (height, width) of the screenshots that will be searched
+        levels: Number of pyramid levels used for the coarse pass
+        include: Template indices to prepare (all templates by default)
+        
+    Returns:
+        Dictionary with the stacked template spectra, per-template statistics
+        and reusable work buffers
+    """
+    height, width = shape
+    coarse_shape = pyramid_shape(shape, levels)
+    fft_shape = (
+        scipy.fft.next_fast_len(coarse_shape[0]),
+        scipy.fft.next_fast_len(coarse_shape[1], real=True),
+    )
+    margin = 2 * 2 ** levels
+    spectra = []
+    inv_norms = []
+    sizes = []
+    indices = []
+    scores = []
+    products = []
+    correlations = []
+    windows = {}
+    refine_results = []
+    
+    for index, template in enumerate(templates):
+        if include is not None and index not in include:
+            continue
+        
+        h, w = template.shape
+        if h > height or w > width:
+            print(f"  - Skipping template #{index} ({w}x{h}): larger than the search region")
+            continue
+        
+        coarse = build_pyramid(template, levels)
+        t_zero = coarse.astype(np.float64) - coarse.mean()
+        spectra.append(np.conj(scipy.fft.rfft2(t_zero, s=fft_shape, workers=-1)))
+        t_norm = np.linalg.norm(t_zero)
+        inv_norms.append(1 / t_norm if t_norm > 1e-6 else 0.0)
+        sizes.append(coarse.shape)
+        indices.append(index)
+        
+        # Per-template spectrum product, correlation and coarse score map
+        valid_shape = (coarse_shape[0] - coarse.shape[0] + 1, coarse_shape[1] - coarse.shape[1] + 1)
+        products.append(np.empty((fft_shape[0], fft_shape[1] // 2 + 1), dtype=np.complex128))
+        correlations.append(np.empty(fft_shape, dtype=np.float64))
+        scores.append(np.empty(valid_shape, dtype=np.float64))
+        
+        # Window statistics are shared by all templates of the same coarse size
+        if coarse.shape not in windows:
+            windows[coarse.shape] = {
+                'sum': np.empty(valid_shape, dtype=np.float64),
+                'spread': np.empty(valid_shape, dtype=np.float64),
+                'mask': np.empty(valid_shape, dtype=bool),
+            }
+        
+        # Full resolution refinement result for this template
+        refine_results.append(np.empty(
+            (min(h + 2 * margin, height) - h + 1, min(w + 2 * margin, width) - w + 1),
+            dtype=np.float32
+        ))
+    
+    if not spectra:
+        print("!! ERROR: All templates are larger than the selected region.")
+        exit()
+    
+    return {
+        'fft_shape': fft_shape,
+        'levels': levels,
+        'spectra': np.stack(spectra),
+        'inv_norms': inv_norms,
+        'sizes': sizes,
+        'indices': indices,
+        'positions': {index: i for i, index in enumerate(indices)},
+        'margin': margin,
+        'scores': scores,
+        'products': products,
+        'correlations': correlations,
+        'windows': windows,
+        'integrals': (
+            np.empty((coarse_shape[0] + 1, coarse_shape[1] + 1), dtype=np.float64),
+            np.empty((coarse_shape[0] + 1, coarse_shape[1] + 1), dtype=np.float64),
+        ),
+        'refine_results': refine_results,
+        'pyramid': [
+            np.empty(pyramid_shape(shape, level + 1), dtype=np.uint8)
+            for level in range(levels)
+        ],
+    }
+
+
+def prepare_local_plans(templates, frame_shape, indices):
+    """
+    Prepare one small search plan per template for looking around its last hit.
+    Each window spans +/-3 template sizes, rounded up to whole screen points;
+    templates whose window would not be much smaller than the full frame are
+    skipped, since searching it locally would save nothing.
+    
+    Args:
+        templates: List of grayscale OpenCV image arrays
+        frame_shape: (height, width) of the full capture region
+        indices: Template indices to prepare local plans for
+        
+    Returns:
+        Dictionary of template index -> (spectra, capture buffer)
+    """
+    step = capture_step()
+    frame_area = frame_shape[0] * frame_shape[1]
+    plans = {}
+    for index in indices:
+        h, w = templates[index].shape
+        local_shape = (
+            -(-LOCAL_SEARCH_SCALE * h // step) * step,
+            -(-LOCAL_SEARCH_SCALE * w // step) * step,
+        )
+        if (local_shape[0] > frame_shape[0] or local_shape[1] > frame_shape[1]
+                or local_shape[0] * local_shape[1] > LOCAL_SEARCH_MAX_AREA * frame_area):
+            continue
+        
+        plans[index] = (
+            prepare_template_spectra(templates, local_shape, include={index}),
+            np.empty(local_shape, dtype=np.uint8),
+        )
+    return plans
+
+
+def window_sums(integral, h, w, out):
+    """
+    Sum every (h, w) window of an image using its integral image.
+    
+    Args:
+        integral: Integral image as returned by cv2.integral / cv2.integral2
+        h: Window height
+        w: Window width
+        out: Preallocated array of shape (H - h + 1, W - w + 1) for the window sums
+    """
+    np.subtract(integral[h:, w:], integral[:-h, w:], out=out)
+    np.subtract(out, integral[h:, :-w], out=out)
+    np.add(out, integral[:-h, :-w], out=out)
+
+
+def window_spread(sum_img, sqsum_img, h, w, window):
+    """
+    Compute the image half of the TM_CCOEFF_NORMED denominator,
+    sqrt(sum((I - mean(I))^2)) over every (h, w) window, into preallocated buffers.
+    It depends only on the window size, so templates of equal size share it.
+    
+    Args:
+        sum_img: Integral image of the screenshot
+        sqsum_img: Integral image of the squared screenshot
+        h: Window height
+        w: Window width
+        window: Buffers for this size from prepare_template_spectra()
+    """
+    window_sum = window['sum']
+    spread = window['spread']
+    
+    window_sums(sum_img, h, w, out=window_sum)
+    window_sums(sqsum_img, h, w, out=spread)
+    
+    # spread = sqrt(max(sqsum - sum^2 / n, 0))
+    np.multiply(window_sum, window_sum, out=window_sum)
+    np.divide(window_sum, h * w, out=window_sum)
+    np.subtract(spread, window_sum, out=spread)
+    np.maximum(spread, 0, out=spread)
+    np.sqrt(spread, out=spread)
+    np.greater(spread, 1e-6, out=window['mask'])
+
+
+def score_template(image_fft, spectra, i):
+    """
+    Compute the TM_CCOEFF_NORMED peak of one template from the image spectrum.
+    Every intermediate is written into the template's preallocated buffers.
+    
+    Args:
+        image_fft: rfft2 of the screenshot, padded to the spectra FFT shape
+        spectra: Template spectra from prepare_template_spectra(), with the
+            window statistics for this template's size already computed
+        i: Position of the template within the spectra
+        
+    Returns:
+        Tuple of (max_val, max_loc)
+    """
+    product = spectra['products'][i]
+    correlation = spectra['correlations'][i]
+    score = spectra['scores'][i]
+    window = spectra['windows'][spectra['sizes'][i]]
+    
+    # Inverse rfft2 as two 1-D passes, which can write into preallocated buffers
+    np.multiply(spectra['spectra'][i], image_fft, out=product)
+    np.fft.ifft(product, axis=0, out=product)
+    np.fft.irfft(product, n=correlation.shape[1], axis=1, out=correlation)
+    
+    numerator = correlation[:score.shape[0], :score.shape[1]]
+    score.fill(0)
+    np.divide(numerator, window['spread'], out=score, where=window['mask'])
+    np.multiply(score, spectra['inv_norms'][i], out=score)
+    
+    min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(score)
+    return max_val, max_loc
+
+
+def match_templates_fft(image_gray, spectra, order, stop_above):
+    """
+    Score templates against an image with frequency-domain correlation.
+    Equivalent to running cv2.matchTemplate with TM_CCOEFF_NORMED per template,
+    but the image is transformed only once and the per-template inverse FFTs
+    run in parallel on TEMPLATE_POOL, at most TEMPLATE_WORKERS at a time.
+    Templates are submitted in search order and each result is checked as soon
+    as it finishes; once one scores above stop_above no more are submitted.
+    
+    Args:
+        image_gray: Grayscale screenshot to search
+        spectra: Template spectra from prepare_template_spectra()
+        order: Template positions within the spectra, in search order
+        stop_above: Confidence that ends the search early
+        
+    Returns:
+        Dictionary mapping template position to its (max_val, max_loc)
+    """
+    image_fft = scipy.fft.rfft2(image_gray, s=spectra['fft_shape'], workers=-1)
+    
+    # Local sums of the image and its square for the CCOEFF_NORMED denominator
+    sum_img, sqsum_img = cv2.integral2(
+        image_gray, *spectra['integrals'], sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F
+    )
+    
+    scores = {}
+    ready_sizes = set()
+    pending = iter(order)
+    running = {}
+    confident = False
+    
+    while True:
+        # Keep up to TEMPLATE_WORKERS templates in flight, in search order
+        while not confident and len(running) < TEMPLATE_WORKERS:
+            i = next(pending, None)
+            if i is None:
+                break
+            
+            # Window statistics once per template size, before any task reads them
+            size = spectra['sizes'][i]
+            if size not in ready_sizes:
+                window_spread(sum_img, sqsum_img, *size, spectra['windows'][size])
+                ready_sizes.add(size)
+            
+            running[TEMPLATE_POOL.submit(score_template, image_fft, spectra, i)] = i
+        
+        # Done once nothing is left to score; in-flight tasks always finish
+        # because they write into shared buffers
+        if not running:
+            break
+        
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            i = running.pop(future)
+            scores[i] = future.result()
+            
+            # Early exit once a template is a confident match
+            if scores[i][0] > stop_above:
+                confident = True
+    
+    return scores
+
+
+def refine_match(image_gray, coarse_loc, spectra, i):
+    """
+    Re-run template matching at full resolution in a small window around a coarse hit.
+    Only the location is refined, so the cheaper TM_SQDIFF_NORMED metric is used
+    directly on the uint8 images and the best position is its minimum.
+    
+    Args:
+        image_gray: Full resolution grayscale screenshot
+        coarse_loc: (x, y) of the match on the downsampled screenshot
+        spectra: Template spectra from prepare_template_spectra()
+        i: Position of the matched template within the spectra
+        
+    Returns:
+        (x, y) location of the template at full resolution
+    """
+    template = BOBBER_TEMPLATES_CV[spectra['indices'][i]]
+    result = spectra['refine_results'][i]
+    scale = 2 ** spectra['levels']
+    h, w = template.shape
+    height, width = image_gray.shape
+    
+    # Fixed-size window of template size plus margin, kept inside the screenshot
+    crop_h = result.shape[0] + h - 1
+    crop_w = result.shape[1] + w - 1
+    x0 = min(max(coarse_loc[0] * scale - spectra['margin'], 0), width - crop_w)
+    y0 = min(max(coarse_loc[1] * scale - spectra['margin'], 0), height - crop_h)
+    
+    crop = image_gray[y0:y0 + crop_h, x0:x0 + crop_w]
+    if use_sad_refine:
+        sad_match(crop, template, result)
+    else:
+        cv2.matchTemplate(crop, template, cv2.TM_SQDIFF_NORMED, result=result)
+    min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+    return x0 + min_loc[0], y0 + min_loc[1]
+
+
+@njit(cache=True, parallel=True, fastmath=True)
+def sad_match(image, template, out):
+    """
+    Sum of absolute differences between the template and every window of the image.
+    Rows of the output run in parallel; LLVM vectorizes the inner loop for the host
+    CPU (AVX2 on x86, NEON on ARM).
+    
+    Args:
+        image: uint8 image to search
+        template: uint8 template
+        out: Preallocated float32 array of shape (H - h + 1, W - w + 1)
+    """
+    h, w = template.shape
+    for y in prange(out.shape[0]):
+        for x in range(out.shape[1]):
+            total = 0
+            for i in range(h):
+                for j in range(w):
+                    diff = np.int32(image[y + i, x + j]) - np.int32(template[i, j])
+                    total += diff if diff >= 0 else -diff
+            out[y, x] = total
+
+
+def profile_refine_backends(spectra, runs=20):
+    """
+    Time the OpenCV refinement once at startup and switch to the Numba SAD kernel
+    only when OpenCV is slower than REFINE_LATENCY_LIMIT and the kernel beats it.
+    
+    Args:
+        spectra: Template spectra from prepare_template_spectra()
+        runs: Number of timed refinements per backend
+        
+    Returns:
+        True if the Numba SAD kernel should be used for refinement
+    """
+    if not HAVE_NUMBA:
+        return False
+    
+    template = BOBBER_TEMPLATES_CV[spectra['indices'][0]]
+    result = spectra['refine_results'][0]
+    crop = rng.integers(
+        0, 256,
+        (result.shape[0] + template.shape[0] - 1, result.shape[1] + template.shape[1] - 1),
+        dtype=np.uint8
+    )
+    
+    def median_latency(refine):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            refine()
+            timings.append(time.perf_counter() - start)
+        return float(np.median(timings))
+    
+    opencv_latency = median_latency(
+        lambda: cv2.matchTemplate(crop, template, cv2.TM_SQDIFF_NORMED, result=result)
+    )
+    if opencv_latency <= REFINE_LATENCY_LIMIT:
+        return False
+    
+    # Compile before timing so the JIT cost is not counted
+    sad_match(crop, template, result)
+    sad_latency = median_latency(lambda: sad_match(crop, template, result))
+    
+    print(f"Refinement latency: OpenCV {opencv_latency * 1000:.2f} ms, "
+          f"Numba SAD {sad_latency * 1000:.2f} ms")
+    return sad_latency < opencv_latency
+
+
+def compute_template_stats(templates):
+    """
+    Precompute the zero-mean copy and L2 norm of every full resolution template,
+    so scoring a match never recomputes template statistics.
+    
+    Args:
+        templates: List of grayscale OpenCV image arrays
+        
+    Returns:
+        List of (t_zero, t_norm) tuples, one per template
+    """
+    stats = []
+    for template in templates:
+        t_zero = (template - template.mean()).astype(np.float32)
+        stats.append((t_zero, float(np.linalg.norm(t_zero))))
+    return stats
+
+
+def match_confidence(image_gray, loc, stats):
+    """
+    Compute the TM_CCOEFF_NORMED score of a template at a single location.
+    Uses the cheaper TM_CCORR against the precomputed zero-mean template and
+    divides by the precomputed template norm times the window's spread.
+    
+    Args:
+        image_gray: Full resolution grayscale screenshot
+        loc: (x, y) top-left corner of the window to score
+        stats: (t_zero, t_norm) from compute_template_stats()
+        
+    Returns:
+        Confidence between -1 and 1
+    """
+    t_zero, t_norm = stats
+    h, w = t_zero.shape
+    x, y = loc
+    window = image_gray[y:y + h, x:x + w].astype(np.float32)
+    
+    numerator = cv2.matchTemplate(window, t_zero, cv2.TM_CCORR)[0, 0]
+    mean, std = cv2.meanStdDev(window)
+    denominator = t_norm * std[0, 0] * np.sqrt(h * w)
+    
+    if denominator < 1e-6:
+        return 0.0
+    return float(numerator / denominator)
+
+
 # =============================================================================
 # USER INTERFACE & SETUP
 # =============================================================================
@@ -493,6 +1239,29 @@ def print_banner():
     ''')
 
 
+def configure_opencv():
+    """
+    Enable OpenCV's optimized code paths and let its parallel_for_ use every core.
+    Warns when the installed build has no parallel framework, in which case
+    cvtColor, pyrDown and matchTemplate run single-threaded.
+    """
+    cv2.setUseOptimized(True)
+    cv2.setNumThreads(os.cpu_count() or 1)
+    
+    for line in cv2.getBuildInformation().splitlines():
+        if line.strip().startswith('Parallel framework:'):
+            framework = line.split(':', 1)[1].strip()
+            break
+    else:
+        framework = ''
+    
+    if not framework or framework.lower() == 'none':
+        print("!! WARNING: This OpenCV build has no parallel framework and will run single-threaded.")
+        print("!! Consider installing 'opencv-contrib-python' or another build with TBB/OpenMP/pthreads.")
+    else:
+        print(f"OpenCV parallel framework: {framework} ({cv2.getNumThreads()} threads)")
+
+
 def get_game_version():
     """
     Prompt user to select game version.
@@ -541,6 +1310,10 @@ def get_casting_key():
     if key == 'exit':
         exit()
     
+    if not pyautogui.isValidKey(key):
+        print(f"\n'{key}' is not a key pyautogui can press. << Exiting >>")
+        exit()
+    
     return key
 
 def get_lure_key():
@@ -556,6 +1329,10 @@ def get_lure_key():
     if key == 'exit':
         exit()
     
+    if not pyautogui.isValidKey(key):
+        print(f"\n'{key}' is not a key pyautogui can press. << Exiting >>")
+        exit()
+    
     return key
 
 
@@ -586,18 +1363,18 @@ def apply_lure():
     # OR if 10 minutes (LURE_COOLDOWN) have passed since the last application
     if last_lure_time is None or (current_time - last_lure_time) > LURE_COOLDOWN:
         
-        print("\n<< Applying Lure... >>")
+        logger.info("\n<< Applying Lure... >>")
         
         # Simulate pressing the lure key
-        pyautogui.keyDown(f'{lurekey}')
-        time.sleep(np.random.uniform(0.1, 0.3)) # Human-like press
-        pyautogui.keyUp(f'{lurekey}')
+        pyautogui.keyDown(lurekey)
+        time.sleep(rng.uniform(0.1, 0.3)) # Human-like press
+        pyautogui.keyUp(lurekey)
         
         # Update the timestamp to the current time
         last_lure_time = current_time
         
         # Wait the required 5.1 seconds after applying
-        print(f"<< Waiting {LURE_POST_WAIT}s after lure application... >>")
+        logger.info(f"<< Waiting {LURE_POST_WAIT}s after lure application... >>")
         time.sleep(LURE_POST_WAIT)
         
     else:
@@ -619,11 +1396,11 @@ def main_loop():
         while True:
             # Check for exit signal
             if esc_pressed:
-                print("<< Exiting >>")
+                logger.info("<< Exiting >>")
                 exit()
 
             # Execute fishing sequence
-            print("\n<< Casting >>")
+            logger.info("\n<< Casting >>")
             apply_lure()
             cast_line()
             find_bob()
@@ -634,11 +1411,11 @@ def main_loop():
                     continue  # Successfully reeled in, cast again
             else:
                 # Bobber not found, wait and retry
-                time.sleep(np.random.uniform(2.3, 3.7))
-                print("<< Could not find Bob. Trying again. >>")
+                time.sleep(rng.uniform(2.3, 3.7))
+                logger.info("<< Could not find Bob. Trying again. >>")
                 
     except KeyboardInterrupt:
-        print("\n<< Interrupted by user >>")
+        logger.info("\n<< Interrupted by user >>")
         exit()
 
 
@@ -649,9 +1426,15 @@ def main_loop():
 if __name__ == "__main__":
     # Display banner
     print_banner()
+    setup_logging()
+    configure_opencv()
+    
+    # Compile the audio peak detector before the first bite
+    audio_peak(np.zeros(1, dtype=np.float32))
     
     # Load bobber templates
     BOBBER_TEMPLATES_CV = load_bobber_templates()
+    BOBBER_TEMPLATE_STATS = compute_template_stats(BOBBER_TEMPLATES_CV)
     
     # Get user configuration
     wait_timer = get_game_version()
@@ -666,6 +1449,18 @@ if __name__ == "__main__":
         print("\nNo region was selected. Exiting.")
         exit()
     
+    # Open the screen capture and precompute coarse template FFTs for its frame size
+    frame_shape = init_capture(BOBBER_REGION)
+    BOBBER_SPECTRA = prepare_template_spectra(BOBBER_TEMPLATES_CV, frame_shape)
+    template_hits = [0] * len(BOBBER_TEMPLATES_CV)
+    template_order = list(BOBBER_SPECTRA['indices'])
+    use_sad_refine = profile_refine_backends(BOBBER_SPECTRA)
+    
+    # Small per-template plans for searching around the previous hit
+    LOCAL_PLANS = prepare_local_plans(BOBBER_TEMPLATES_CV, frame_shape, BOBBER_SPECTRA['indices'])
+    print(f"Local search enabled for {len(LOCAL_PLANS)} of "
+          f"{len(BOBBER_SPECTRA['indices'])} template(s).")
+    
     # Get casting key
     castingkey = get_casting_key()
     # Get apply lure key